@@ -2,11 +2,12 @@ from io import TextIOWrapper
 
 import requests
 
+from .internal.levenshtein import lev_dist_filters
 from .internal.util import contents2list, is_all_lower, to_wordline_array
 from .internal.validation_tests import validate_sanitized_preamble, validate_sanitized, \
     validate_levenshtein_distance_preamble, validate_levenshtein_distance, \
     validate_uniq_chars_preamble, validate_uniq_chars, validate_length_preamble, \
-    validate_length
+    validate_length, lev_dist_engines, stop_lev_dist_internal
 from .InvalidRemoteContent import InvalidRemoteContent
 from .InvalidWordList import InvalidWordList
 from .ValidWordList import ValidWordList
@@ -126,39 +127,171 @@ class BIP39WordList:
         else:
             raise InvalidWordList(**obj)
 
-    def test_lev_distance(self, n):
+    def test_lev_distance(self, n, engine='jellyfish', workers=1, filters=('length',),
+                          max_dist=None, fail_fast=False):
         """Runs the minimum Levenshtein distance test.
 
       The minimum Levenshtein distance test takes each
       combination of two words in the wordlist and
       calculates the Levenshtein distance between them.
 
+      The ``jellyfish`` engine computes the distance of every
+      word pair, and so does the ``bitparallel`` engine with
+      Myers' bit-vector algorithm in pure Python. The ``numpy``
+      engine also computes every distance, comparing each word
+      with all the previous ones at once, and requires NumPy to be
+      installed. The ``banded``
+      engine stops computing a distance as soon as it is known
+      to be at least ``n``, and the ``bktree`` engine looks up the words closer than ``n`` in a BK-tree
+      instead of visiting every pair, which scales to dictionaries
+      with hundreds of thousands of words. With these two engines
+      the returned ``LevDistResult`` only contains the word pairs
+      with a distance less than ``n``.
+
+      The ``banded`` engine runs each word pair through the lower
+      bounds of the Levenshtein distance in ``filters`` before the
+      kernel, in order: ``length`` (length difference), ``bag``
+      (character histogram distance) and ``qgram`` (shared bigrams).
+      A pair is discarded by the first bound that reaches ``n``,
+      which never changes the result. The number of pairs discarded
+      by each filter is available in ``LevDistResult.filter_counts``.
+
+      If ``max_dist`` is given, the returned ``LevDistResult`` only
+      contains the word pairs with a distance up to ``max_dist``,
+      which must be at least ``n - 1`` so that every pair failing
+      the test is kept. Its methods raise ``DistanceNotRetained``
+      when asked for greater distances, for example by the ``_gt``
+      methods. The ``banded`` and ``bktree`` engines default to
+      ``n - 1``.
+
+      With ``fail_fast``, the test stops after the row (or tile, with
+      several workers) of the first word pair closer than ``n``, and
+      raises ``ValidationFailed`` with the pairs found so far. Only
+      those pairs are kept, as with ``max_dist = n - 1``, and the
+      result has ``complete`` set to ``False`` if it stopped early.
+
+      With more than one worker, the word pairs are split into
+      tiles holding about the same number of pairs, and the tiles
+      are computed by a pool of ``workers`` processes.
+
       :param n: minimum Levenshtein distance required
       :type n: int
+      :param engine: ``jellyfish``, ``bitparallel``, ``numpy``, ``banded`` or
+        ``bktree``, defaults to ``jellyfish``
+      :type engine: str, optional
+      :param workers: number of processes to compute the distances with,
+        defaults to 1
+      :type workers: int, optional
+      :param filters: names of the lower bounds used by the ``banded``
+        engine, defaults to ``('length',)``
+      :type filters: tuple, optional
+      :param max_dist: largest Levenshtein distance to retain, defaults
+        to ``None`` (the distances of all word pairs computed)
+      :type max_dist: int, optional
+      :param fail_fast: stop at the first word pair closer than ``n``,
+        defaults to ``False``
+      :type fail_fast: bool, optional
       :returns: an instance of ``LevDistResult``
       :raises ValidationFailed: <LevDistResult object>
       """
         assert type(n) == int, 'Invalid type "{}" for argument `n` (expected "int")' \
             .format(type(n).__name__)
         assert n > 0, 'Distance must be greater than 0'
+        assert engine in lev_dist_engines, 'Invalid Levenshtein distance engine "{}"' \
+            .format(engine)
+        assert type(workers) == int, 'Invalid type "{}" for argument `workers` (expected "int")' \
+            .format(type(workers).__name__)
+        assert workers > 0, 'Number of workers must be greater than 0'
+        for name in filters:
+            assert name in lev_dist_filters, 'Invalid Levenshtein distance filter "{}"' \
+                .format(name)
+        if max_dist is not None:
+            assert type(max_dist) == int, 'Invalid type "{}" for argument `max_dist` (expected "int")' \
+                .format(type(max_dist).__name__)
+            assert max_dist >= n - 1, 'Maximum distance must be at least n-1'
+        assert type(fail_fast) == bool, 'Invalid type "{}" for argument `fail_fast` (expected "bool")' \
+            .format(type(fail_fast).__name__)
+        assert not fail_fast or max_dist in [None, n - 1], \
+            'Only distances less than n are retained with `fail_fast`'
+        if fail_fast:
+            max_dist = n - 1
 
         self.test_lowercase()
-        low, high, callback, kwargs = self._test_lev_distance_1(n)
+        low, high, callback, kwargs = self._test_lev_distance_1(n, engine, workers, filters,
+                                                                max_dist)
         for i in range(low, high):
             kwargs = callback(i, **kwargs)
+            if fail_fast and i < high - 1 and stop_lev_dist_internal(kwargs):
+                break
         return self._test_lev_distance_2(kwargs)
 
-    def _test_lev_distance_1(self, n):
-        return validate_levenshtein_distance_preamble(self.word_line_sorted, n)
+    def _test_lev_distance_1(self, n, engine='jellyfish', workers=1, filters=('length',),
+                             max_dist=None):
+        return validate_levenshtein_distance_preamble(self.word_line_sorted, n, engine,
+                                                      workers, filters, max_dist)
 
     def _test_lev_distance_2(self, kwargs):
         success, res = validate_levenshtein_distance(**kwargs)
-        obj = LevDistResult(res, self.words_sorted, self.lines_sorted, threshold=kwargs['n'])
+        obj = LevDistResult(res, self.words_sorted, self.lines_sorted, threshold=kwargs['n'],
+                            filter_counts=kwargs.get('filter_counts'),
+                            max_dist=kwargs.get('max_dist'),
+                            complete=kwargs.get('complete', True))
         if success:
             return obj
         else:
             raise ValidationFailed(obj)
 
+    def iter_lev_violations(self, n, engine='jellyfish', workers=1):
+        """Yields the word pairs closer than a Levenshtein distance as they are found.
+
+      Runs the same computation as ``test_lev_distance()``, but
+      instead of returning a ``LevDistResult`` at the end, yields each
+      word pair with a distance less than ``n`` once its row (or tile,
+      with several workers) has been computed, and then forgets it, so
+      memory use does not grow with the number of pairs. Pairs are
+      yielded in the order of the sorted wordlist, with the word that
+      comes first in it as ``word_a``.
+
+      :param n: minimum Levenshtein distance required
+      :type n: int
+      :param engine: engine computing the distances, see
+        ``test_lev_distance()``, defaults to ``jellyfish``
+      :type engine: str, optional
+      :param workers: number of processes to compute the distances with,
+        defaults to 1
+      :type workers: int, optional
+      :returns: a generator of ``(word_a, line_a, word_b, line_b, dist)``
+        tuples
+      """
+        assert type(n) == int, 'Invalid type "{}" for argument `n` (expected "int")' \
+            .format(type(n).__name__)
+        assert n > 0, 'Distance must be greater than 0'
+        assert engine in lev_dist_engines, 'Invalid Levenshtein distance engine "{}"' \
+            .format(engine)
+        assert type(workers) == int, 'Invalid type "{}" for argument `workers` (expected "int")' \
+            .format(type(workers).__name__)
+        assert workers > 0, 'Number of workers must be greater than 0'
+
+        self.test_lowercase()
+        low, high, callback, kwargs = self._test_lev_distance_1(n, engine, workers,
+                                                                max_dist=n - 1)
+        words = self.words_sorted
+        lines = self.lines_sorted
+        i = low
+        try:
+            for i in range(low, high):
+                kwargs = callback(i, **kwargs)
+                arr = kwargs['distance_array']
+                for first, second, dist in zip(arr.firsts, arr.seconds, arr.dists):
+                    yield (words[first], lines[first], words[second], lines[second], dist)
+                arr.clear()
+        finally:
+            # The generator was closed before the end
+            pool = kwargs.get('pool')
+            if pool is not None and i < high - 1:
+                pool.terminate()
+                pool.join()
+
     def test_initial_chars(self, n):
         """Runs the maximum unique initial characters test.
 
@@ -0,0 +1,21 @@
+class DistanceNotRetained(KeyError):
+    """Levenshtein distance was not retained.
+
+  Exception raised by methods in ``LevDistResult`` when they are
+  asked for distances greater than the largest one the test kept
+  (see ``LevDistResult.max_dist``). It is a ``KeyError``, like the
+  one raised for pairs that are not found. This class is not
+  meant to be created directly.
+  """
+
+    """The largest distance asked for"""
+    dist = None
+
+    """The largest distance that was retained"""
+    max_dist = None
+
+    def __init__(self, dist, max_dist):
+        super().__init__('Levenshtein distances greater than {} were not retained'
+                         .format(max_dist))
+        self.dist = dist
+        self.max_dist = max_dist
@@ -1,3 +1,7 @@
+from array import array
+from heapq import merge
+
+from .DistanceNotRetained import DistanceNotRetained
 from .internal.util import is_all_lower
 
 
@@ -11,15 +15,35 @@ class LevDistResult:
     """Test conducted with a minimum Levenshtien distance of ``threshold``."""
     threshold = None
 
-    def __init__(self, res, words_sorted, lines_sorted, threshold):
-        lev, split = res
-        self.split = split
+    """Number of word pairs discarded by each lower bound filter of the
+  ``banded`` engine, and number of pairs left for the kernel (key ``kernel``).
+  ``None`` with the other engines."""
+    filter_counts = None
+
+    """Largest Levenshtein distance retained, or ``None`` if the
+  distances of all word pairs were. Asking for greater distances
+  raises ``DistanceNotRetained``."""
+    max_dist = None
+
+    """``False`` if the test stopped at the first word pair closer than
+  ``threshold`` (fail-fast mode), so that only the pairs found until then
+  are present."""
+    complete = True
+
+    def __init__(self, res, words_sorted, lines_sorted, threshold, filter_counts=None,
+                 max_dist=None, complete=True):
+        self.lev_dist_arr = res
+        self.complete = complete
+        self.filter_counts = filter_counts
+        self.max_dist = max_dist
         self.words_sorted = words_sorted
         self.lines_sorted = lines_sorted
         self.threshold = threshold
+        self._word_indices = None
+        self._adjacency = None
 
     def __len__(self):
-        return len(self.split)
+        return len(self.lev_dist_arr)
 
     def _index_pair(self, first, second):
         return (first, second)
@@ -30,12 +54,81 @@ class LevDistResult:
     def _line_pair(self, first, second):
         return (self.lines_sorted[first], self.lines_sorted[second])
 
+    # Raises DistanceNotRetained if distances up to `largest` were asked for
+    # but not all of them were retained.
+    def _check_retained(self, largest):
+        if self.max_dist is not None and largest > self.max_dist:
+            raise DistanceNotRetained(largest, self.max_dist)
+
+    # Returns pair(first, second) of each stored pair whose distance is in
+    # `wanted`.
+    def _pairs(self, wanted, pair):
+        arr = self.lev_dist_arr
+        firsts = arr.firsts
+        seconds = arr.seconds
+        return [pair(firsts[k], seconds[k]) for k in arr.select(wanted)]
+
+    # Returns a dictionary mapping each word to the list of its indices in
+    # ``words_sorted`` (a word only has several if it is duplicated).
+    def _indices(self):
+        if self._word_indices is None:
+            word_indices = {}
+            for idx, word in enumerate(self.words_sorted):
+                word_indices.setdefault(word, []).append(idx)
+            self._word_indices = word_indices
+        return self._word_indices
+
+    # Builds the per-word index the first time it is needed. For each word
+    # index it holds a dictionary mapping each distance to an array of the
+    # indices of the words at that distance from it, in ascending order.
+    def _neighbors(self):
+        if self._adjacency is None:
+            arr = self.lev_dist_arr
+            typecode = arr.firsts.typecode
+            adjacency = [{} for _ in range(0, len(self.words_sorted))]
+            for first, second, dist in zip(arr.firsts, arr.seconds, arr.dists):
+                bucket = adjacency[first].get(dist)
+                if bucket is None:
+                    bucket = adjacency[first][dist] = array(typecode)
+                bucket.append(second)
+                bucket = adjacency[second].get(dist)
+                if bucket is None:
+                    bucket = adjacency[second][dist] = array(typecode)
+                bucket.append(first)
+            self._adjacency = adjacency
+        return self._adjacency
+
+    # Returns the (word pair, line pair, distance) tuples of each stored pair
+    # containing `word` whose distance is in `wanted`, sorted by the index of
+    # the other word, which comes first in each pair. Only the buckets of
+    # `word` in the per-word index are visited.
+    def _dist_all(self, word, wanted):
+        indices = self._indices().get(word, [])
+        adjacency = self._neighbors()
+        found = []
+        for correct_idx in indices:
+            buckets = adjacency[correct_idx]
+            dists = [d for d in buckets if d in wanted]
+            found.extend(merge(*[[(other_idx, correct_idx, d) for other_idx in buckets[d]
+                                  if not (other_idx < correct_idx and other_idx in indices)]
+                                 for d in dists]))
+        if len(indices) > 1:
+            found.sort()
+        dist_all = [(self._word_pair(other_idx, correct_idx),
+                     self._line_pair(other_idx, correct_idx), d)
+                    for other_idx, correct_idx, d in found]
+        if not dist_all:
+            raise KeyError("word \"{}\" not found".format(word))
+        else:
+            return dist_all
+
     def getwordpairs_eq(self, dist=None):
         """Gets the word pairs which have a Levenshtein distance of ``dist``
 
   :param dist: Levenshtein distance
   :type dist: int
   :returns: a list of word pairs
+  :raises DistanceNotRetained: if the distances asked for were not retained
   """
         if not dist:
             dist = self.threshold
@@ -43,15 +136,8 @@ class LevDistResult:
             .format(type(dist).__name__)
         assert dist > 0, 'Distance must be greater than 0'
 
-        pairs = []
-        for node in self.split:
-            data = node.split(',')
-            dist_split = int(data[0])
-            first = int(data[1])
-            second = int(data[2])
-            if dist_split == dist:
-                pairs.append(self._word_pair(first, second))
-        return pairs
+        self._check_retained(dist)
+        return self._pairs([dist], self._word_pair)
 
     def getlinepairs_eq(self, dist=None):
         """Gets the line numbers of pairs which have a Levenshtein distance of ``dist``
@@ -59,6 +145,7 @@ class LevDistResult:
           :param dist: Levenshtein distance
           :type dist: int
           :returns: a list of line pairs
+          :raises DistanceNotRetained: if the distances asked for were not retained
           """
 
         if not dist:
@@ -67,15 +154,8 @@ class LevDistResult:
             .format(type(dist).__name__)
         assert dist > 0, 'Distance must be greater than 0'
 
-        pairs = []
-        for node in self.split:
-            data = node.split(',')
-            dist_split = int(data[0])
-            first = int(data[1])
-            second = int(data[2])
-            if dist_split == dist:
-                pairs.append(self._line_pair(first, second))
-        return pairs
+        self._check_retained(dist)
+        return self._pairs([dist], self._line_pair)
 
     def getwordpairs_lt(self, dist=None):
         """Gets the word pairs which have a Levenshtein distance less than ``dist``
@@ -83,6 +163,7 @@ class LevDistResult:
           :param dist: Levenshtein distance
           :type dist: int
           :returns: a list of word pairs
+          :raises DistanceNotRetained: if the distances asked for were not retained
           """
 
         if not dist:
@@ -91,15 +172,8 @@ class LevDistResult:
             .format(type(dist).__name__)
         assert dist > 0, 'Distance must be greater than 0'
 
-        pairs = []
-        for node in self.split:
-            data = node.split(',')
-            dist_split = int(data[0])
-            first = int(data[1])
-            second = int(data[2])
-            if dist_split < dist:
-                pairs.append(self._word_pair(first, second))
-        return pairs
+        self._check_retained(dist - 1)
+        return self._pairs(range(0, dist), self._word_pair)
 
     def getlinepairs_lt(self, dist=None):
         """Gets the line numbers of pairs which have a Levenshtein distance less than ``dist``
@@ -107,6 +181,7 @@ class LevDistResult:
           :param dist: Levenshtein distance
           :type dist: int
           :returns: a list of line number pairs
+          :raises DistanceNotRetained: if the distances asked for were not retained
           """
 
         if not dist:
@@ -115,22 +190,16 @@ class LevDistResult:
             .format(type(dist).__name__)
         assert dist > 0, 'Distance must be greater than 0'
 
-        pairs = []
-        for node in self.split:
-            data = node.split(',')
-            dist_split = int(data[0])
-            first = int(data[1])
-            second = int(data[2])
-            if dist_split < dist:
-                pairs.append(self._line_pair(first, second))
-        return pairs
+        self._check_retained(dist - 1)
+        return self._pairs(range(0, dist), self._line_pair)
 
     def getwordpairs_gt(self, dist=None):
         """Gets the word pairs which have a Levenshtein distance greater than ``dist``
 
   :param dist: Levenshtein distance
   :type dist: int
-  :returns: a list of word pairs"""
+  :returns: a list of word pairs
+  :raises DistanceNotRetained: if the distances asked for were not retained"""
 
         if not dist:
             dist = self.threshold
@@ -138,22 +207,16 @@ class LevDistResult:
             .format(type(dist).__name__)
         assert dist > 0, 'Distance must be greater than 0'
 
-        pairs = []
-        for node in self.split:
-            data = node.split(',')
-            dist_split = int(data[0])
-            first = int(data[1])
-            second = int(data[2])
-            if dist_split > dist:
-                pairs.append(self._word_pair(first, second))
-        return pairs
+        self._check_retained(0xFFFF)
+        return self._pairs(range(dist + 1, 0x10000), self._word_pair)
 
     def getlinepairs_gt(self, dist=None):
         """Gets the line numbers of pairs which have a Levenshtein distance greater than ``dist``
 
   :param dist: Levenshtein distance
   :type dist: int
-  :returns: a list of line number pairs"""
+  :returns: a list of line number pairs
+  :raises DistanceNotRetained: if the distances asked for were not retained"""
 
         if not dist:
             dist = self.threshold
@@ -161,15 +224,8 @@ class LevDistResult:
             .format(type(dist).__name__)
         assert dist > 0, 'Distance must be greater than 0'
 
-        pairs = []
-        for node in self.split:
-            data = node.split(',')
-            dist_split = int(data[0])
-            first = int(data[1])
-            second = int(data[2])
-            if dist_split > dist:
-                pairs.append(self._line_pair(first, second))
-        return pairs
+        self._check_retained(0xFFFF)
+        return self._pairs(range(dist + 1, 0x10000), self._line_pair)
 
 
     def getwordpairs_list(self, dists):
@@ -177,50 +233,38 @@ class LevDistResult:
 
       :param dists: list of Levenshtein distances
       :type dists: list
-      :returns: a list of word pairs"""
+      :returns: a list of word pairs
+      :raises DistanceNotRetained: if the distances asked for were not retained"""
         assert type(dists) == list, 'Invalid type "{}" for argument `dists` (expected "list")' \
             .format(type(dists).__name__)
         assert len(dists) > 0, "Cannot use empty list as list of dists"
 
-        pairs = []
         for i in range(0, len(dists)):
             assert type(dists[i]) == int, 'Invalid type "{}" for list element of `dists` (expected "int")' \
                 .format(type(dists[i]).__name__)
             assert dists[i] > 0, "Distance must be greater than 0"
 
-        for node in self.split:
-            data = node.split(',')
-            dist_split = int(data[0])
-            first = int(data[1])
-            second = int(data[2])
-            if dist_split in dists:
-                pairs.append(self._word_pair(first, second))
-        return pairs
+        self._check_retained(max(dists))
+        return self._pairs(dists, self._word_pair)
 
     def getlinepairs_list(self, dists):
         """Gets the line numbers of pairs which have a Levenshtein distance inside the list ``dists``
 
       :param dists: list of Levenshtein distances
       :type dists: list
-      :returns: a list of line number pairs"""
+      :returns: a list of line number pairs
+      :raises DistanceNotRetained: if the distances asked for were not retained"""
         assert type(dists) == list, 'Invalid type "{}" for argument `dists` (expected "list")' \
             .format(type(dists).__name__)
         assert len(dists) > 0, "Cannot use empty list as list of dists"
 
-        pairs = []
         for i in range(0, len(dists)):
             assert type(dists[i]) == int, 'Invalid type "{}" for list element of `dists` (expected "int")' \
                 .format(type(dists[i]).__name__)
             assert dists[i] > 0, "Distance must be greater than 0"
 
-        for node in self.split:
-            data = node.split(',')
-            dist_split = int(data[0])
-            first = int(data[1])
-            second = int(data[2])
-            if dist_split in dists:
-                pairs.append(self._line_pair(first, second))
-        return pairs
+        self._check_retained(max(dists))
+        return self._pairs(dists, self._line_pair)
 
     def getdist(self, word1, word2):
         """Gets Levenshtein distance between ``word1`` and ``word2``
@@ -229,7 +273,8 @@ class LevDistResult:
       :type word1: str
       :param word2: second word
       :type word2: str
-      :returns: Levenshtein distance between ``word1`` and ``word2``"""
+      :returns: Levenshtein distance between ``word1`` and ``word2``
+      :raises DistanceNotRetained: if the distance between the words was not retained"""
         assert type(word1) == str, 'Invalid type "{}" for argument `word1` (expected "str")' \
             .format(type(word1).__name__)
         assert len(word1) > 0, "Cannot use empty string as word"
@@ -240,27 +285,26 @@ class LevDistResult:
         assert len(word2) > 0, "Cannot use empty string as word"
         assert is_all_lower(word2), 'Word "{}" is not all ASCII lowercase'.format(word2)
 
-        if not is_all_lower(word1):
-            raise ValueError("{} is not all lowercase".format(word1))
-        if not is_all_lower(word2):
-            raise ValueError("{} is not all lowercase".format(word2))
         if word1 > word2:
             word1, word2 = (word2, word1)
 
-        dist = None
-        for node in self.split:
-            data = node.split(',')
-            dist_split = int(data[0])
-            first = int(data[1])
-            second = int(data[2])
-            if self.words_sorted[first] == word1 and self.words_sorted[second] == word2:
-                dist = dist_split
-                break
-        if not dist:
+        # The first occurrence of each word is used; if both words are the
+        # same, its first two occurrences are.
+        indices = self._indices()
+        idx1 = indices.get(word1, [])
+        idx2 = indices.get(word2, [])
+        if word1 == word2:
+            idx2 = idx2[1:]
+        offset = None
+        if idx1 and idx2:
+            offset = self.lev_dist_arr.offset(idx1[0], idx2[0])
+            if offset is None and self.max_dist is not None:
+                raise DistanceNotRetained(None, self.max_dist)
+        if offset is None:
             raise KeyError("word pair \"{}\" and \"{}\" not found".format(word1,
                                                                           word2))
         else:
-            return dist
+            return self.lev_dist_arr.dists[offset]
 
 
     def getdist_all(self, word):
@@ -268,32 +312,15 @@ class LevDistResult:
 
   :param word: the word
   :type word: str
-  :returns: list of Levenshtein distances between ``word`` and each word"""
+  :returns: list of Levenshtein distances between ``word`` and each word
+  :raises DistanceNotRetained: if the distances asked for were not retained"""
         assert type(word) == str, 'Invalid type "{}" for argument `word` (expected "str")' \
             .format(type(word).__name__)
         assert len(word) > 0, "Cannot use empty string as word"
         assert is_all_lower(word), 'Word "{}" is not all ASCII lowercase'.format(word)
 
-        dist_all = []
-        for node in self.split:
-            data = node.split(',')
-            dist_split = int(data[0])
-            first = int(data[1])
-            second = int(data[2])
-            correct_idx = None
-            if self.words_sorted[first] == word:
-                correct_idx = first
-                other_idx = second
-            elif self.words_sorted[second] == word:
-                correct_idx = second
-                other_idx = first
-            if correct_idx != None:
-                dist_all.append((self._word_pair(other_idx, correct_idx),
-                                 self._line_pair(other_idx, correct_idx), dist_split))
-        if not dist_all:
-            raise KeyError("word \"{}\" not found".format(word))
-        else:
-            return dist_all
+        self._check_retained(0xFFFF)
+        return self._dist_all(word, range(0, 0x10000))
 
     def getdist_all_eq(self, word, dist=None):
         """Gets Levenshtein distance between ``word`` and all other words, equal to ``dist``
@@ -302,7 +329,8 @@ class LevDistResult:
       :type word: str
       :param dist: Levenshtein distance
       :type dist: int
-      :returns: list of Levenshtein distances between ``word`` and each word"""
+      :returns: list of Levenshtein distances between ``word`` and each word
+      :raises DistanceNotRetained: if the distances asked for were not retained"""
         if not dist:
             dist = self.threshold
         assert type(word) == str, 'Invalid type "{}" for argument `word` (expected "str")' \
@@ -314,27 +342,8 @@ class LevDistResult:
             .format(type(dist).__name__)
         assert dist > 0, 'Distance must be greater than 0'
 
-        dist_all = []
-        for node in self.split:
-            data = node.split(',')
-            dist_split = int(data[0])
-            first = int(data[1])
-            second = int(data[2])
-            if dist_split == dist:
-                correct_idx = None
-                if self.words_sorted[first] == word:
-                    correct_idx = first
-                    other_idx = second
-                elif self.words_sorted[second] == word:
-                    correct_idx = second
-                    other_idx = first
-                if correct_idx != None:
-                    dist_all.append((self._word_pair(other_idx, correct_idx),
-                                     self._line_pair(other_idx, correct_idx), dist_split))
-        if not dist_all:
-            raise KeyError("word \"{}\" not found".format(word))
-        else:
-            return dist_all
+        self._check_retained(dist)
+        return self._dist_all(word, [dist])
 
     def getdist_all_lt(self, word, dist=None):
         """Gets Levenshtein distance between ``word`` and all other words, less than ``dist``
@@ -343,7 +352,8 @@ class LevDistResult:
           :type word: str
           :param dist: Levenshtein distance
           :type dist: int
-          :returns: list of Levenshtein distances between ``word`` and each word"""
+          :returns: list of Levenshtein distances between ``word`` and each word
+          :raises DistanceNotRetained: if the distances asked for were not retained"""
         if not dist:
             dist = self.threshold
         assert type(word) == str, 'Invalid type "{}" for argument `word` (expected "str")' \
@@ -355,27 +365,8 @@ class LevDistResult:
             .format(type(dist).__name__)
         assert dist > 0, 'Distance must be greater than 0'
 
-        dist_all = []
-        for node in self.split:
-            data = node.split(',')
-            dist_split = int(data[0])
-            first = int(data[1])
-            second = int(data[2])
-            if dist_split < dist:
-                correct_idx = None
-                if self.words_sorted[first] == word:
-                    correct_idx = first
-                    other_idx = second
-                elif self.words_sorted[second] == word:
-                    correct_idx = second
-                    other_idx = first
-                if correct_idx != None:
-                    dist_all.append((self._word_pair(other_idx, correct_idx),
-                                     self._line_pair(other_idx, correct_idx), dist_split))
-        if not dist_all:
-            raise KeyError("word \"{}\" not found".format(word))
-        else:
-            return dist_all
+        self._check_retained(dist - 1)
+        return self._dist_all(word, range(0, dist))
 
     def getdist_all_gt(self, word, dist=None):
         """Gets Levenshtein distance between ``word`` and all other words, greater than ``dist``
@@ -384,7 +375,8 @@ class LevDistResult:
           :type word: str
           :param dist: Levenshtein distance
           :type dist: int
-          :returns: list of Levenshtein distances between ``word`` and each word"""
+          :returns: list of Levenshtein distances between ``word`` and each word
+          :raises DistanceNotRetained: if the distances asked for were not retained"""
         if not dist:
             dist = self.threshold
         assert type(word) == str, 'Invalid type "{}" for argument `word` (expected "str")' \
@@ -396,27 +388,8 @@ class LevDistResult:
             .format(type(dist).__name__)
         assert dist > 0, 'Distance must be greater than 0'
 
-        dist_all = []
-        for node in self.split:
-            data = node.split(',')
-            dist_split = int(data[0])
-            first = int(data[1])
-            second = int(data[2])
-            if dist_split > dist:
-                correct_idx = None
-                if self.words_sorted[first] == word:
-                    correct_idx = first
-                    other_idx = second
-                elif self.words_sorted[second] == word:
-                    correct_idx = second
-                    other_idx = first
-                if correct_idx != None:
-                    dist_all.append((self._word_pair(other_idx, correct_idx),
-                                     self._line_pair(other_idx, correct_idx), dist_split))
-        if not dist_all:
-            raise KeyError("word \"{}\" not found".format(word))
-        else:
-            return dist_all
+        self._check_retained(0xFFFF)
+        return self._dist_all(word, range(dist + 1, 0x10000))
 
     def getdist_all_list(self, word, dists):
         """Gets Levenshtein distance between ``word`` and all other words, inside the list ``dists``
@@ -425,7 +398,8 @@ class LevDistResult:
           :type word: str
           :param dists: list of Levenshtein distances
           :type dists: list
-          :returns: list of Levenshtein distances between ``word`` and each word"""
+          :returns: list of Levenshtein distances between ``word`` and each word
+          :raises DistanceNotRetained: if the distances asked for were not retained"""
         assert type(word) == str, 'Invalid type "{}" for argument `word` (expected "str")' \
             .format(type(word).__name__)
         assert len(word) > 0, "Cannot use empty string as word"
@@ -440,24 +414,5 @@ class LevDistResult:
                 .format(type(dists[i]).__name__)
             assert dists[i] > 0, "Distance must be greater than 0"
 
-        dist_all = []
-        for node in self.split:
-            data = node.split(',')
-            dist_split = int(data[0])
-            first = int(data[1])
-            second = int(data[2])
-            if dist_split in dists:
-                correct_idx = None
-                if self.words_sorted[first] == word:
-                    correct_idx = first
-                    other_idx = second
-                elif self.words_sorted[second] == word:
-                    correct_idx = second
-                    other_idx = first
-                if correct_idx != None:
-                    dist_all.append((self._word_pair(other_idx, correct_idx),
-                                     self._line_pair(other_idx, correct_idx), dist_split))
-        if not dist_all:
-            raise KeyError("word \"{}\" not found".format(word))
-        else:
-            return dist_all
+        self._check_retained(max(dists))
+        return self._dist_all(word, dists)
@@ -48,6 +48,7 @@ have been generally accepted by the community.
 
 
 from .InvalidRemoteContent import InvalidRemoteContent
+from .DistanceNotRetained import DistanceNotRetained
 from .InvalidWordList import InvalidWordList
 from .ValidWordList import ValidWordList
 from .ValidationFailed import ValidationFailed
@@ -56,6 +57,6 @@ from .InitUniqResult import InitUniqResult
 from .MaxLengthResult import MaxLengthResult
 from .BIP39WordList import BIP39WordList
 
-__all__ = ['InvalidRemoteContent', 'InvalidWordList', 'ValidWordList',
-           'ValidationFailed', 'LevDistResult', 'InitUniqResult', 'MaxLengthResult',
+__all__ = ['InvalidRemoteContent', 'DistanceNotRetained', 'InvalidWordList',
+           'ValidWordList', 'ValidationFailed', 'LevDistResult', 'InitUniqResult', 'MaxLengthResult',
            'BIP39WordList']
@@ -28,6 +28,8 @@ from os.path import abspath
 from bip39validator.InvalidWordList import InvalidWordList
 from bip39validator.ValidationFailed import ValidationFailed
 from bip39validator.BIP39WordList import BIP39WordList
+from bip39validator.internal.validation_tests import lev_dist_engines, \
+    stop_lev_dist_internal
 from bip39validator.internal.logging import setargs, progressbar, logerror, loginfo, \
     logdefault, separator, logwarning
 from bip39validator.__version__ import __version__
@@ -98,6 +100,15 @@ def main():
         parser.add_argument('-l', '--max-length', dest='max_length',
                             default=default_max_length, type=int, help='set the maximum length of \
   each word (default: {})'.format(default_max_length))
+        parser.add_argument('-e', '--engine', dest='engine', default='jellyfish',
+                            choices=sorted(lev_dist_engines), help='set the engine used \
+  to compute Levenshtein distances (default: jellyfish)')
+        parser.add_argument('-j', '--jobs', dest='jobs', default=1, type=int,
+                            help='set the number of processes computing Levenshtein \
+  distances (default: 1)')
+        parser.add_argument('--fail-fast', dest='fail_fast', action='store_true',
+                            help='stop the Levenshtein distance test at the first word \
+  pair below the minimum distance')
         parser.add_argument('-D', '--no-levenshtein-distance', dest='no_lev_dist',
                             help='do not run the Levenshtein distance test', action='store_true')
         parser.add_argument('-U', '--no-initial-unique', dest='no_init_uniq',
@@ -145,6 +156,9 @@ def main():
             logerror("Invalid value for --min-levenshtein-distance {}".format(
                 args.lev_dist))
             abort(args.debug)
+        if args.jobs <= 0:
+            logerror("Invalid value for --jobs {}".format(args.jobs))
+            abort(args.debug)
         if args.init_uniq <= 0:
             logerror("Invalid value for --min-initial-unique {}".format(
                 args.init_uniq))
@@ -200,10 +214,15 @@ def main():
         if not args.no_lev_dist:
             logdefault("Performing Levenshtein distance test")
             try:
-                tup = bip39._test_lev_distance_1(n=args.lev_dist)
+                # Only the pairs below the threshold are reported, so the
+                # others are not kept.
+                tup = bip39._test_lev_distance_1(n=args.lev_dist, engine=args.engine,
+                                                 workers=args.jobs,
+                                                 max_dist=args.lev_dist - 1)
                 kwargs = tup[3]
+                stop = stop_lev_dist_internal if args.fail_fast else None
                 kwargs = progressbar('Computing Levenshtein distance', tup[0],
-                                     tup[1], tup[2], **kwargs)
+                                     tup[1], tup[2], stop=stop, **kwargs)
                 bip39._test_lev_distance_2(kwargs)
                 loginfo("No word pairs with Levenshtein distance less than {}" \
                             .format(args.lev_dist))
@@ -224,6 +243,9 @@ def main():
                     logerror("")
                 logerror("{} total words below minimum Levenshtein distance".format(len(
                     word_pairs)))
+                if not lev_dist.complete:
+                    logerror("Stopped at the first word pairs below minimum Levenshtein \
+distance (--fail-fast)")
                 logerror("Levenshtein distance test failed")
 
             logdefault("Finished performing Levenshtein distance test")
@@ -20,6 +20,8 @@
 # LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
 # FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
 # IN THE SOFTWARE.
+from array import array
+from itertools import compress
 
 # A data structure consisting of
 # - An array of strings `word_list`
@@ -47,6 +49,103 @@ class LevDist:
         self.words = kwargs['words']
 
 
+# Packed store of Levenshtein distances, consisting of
+# - An array of distances `dists`
+# - An array of indices of the first word of each pair `firsts`
+# - An array of indices of the second word of each pair `seconds`
+# Indices refer to the sorted wordlist the distances were computed from. The
+# narrowest array types that can hold every index and distance are used, so a
+# 2048-word list takes 5 bytes per word pair.
+# As long as whole rows are added with extend_row(), the store is `dense`:
+# pair (j, i) with j < i is at offset i*(i-1)/2 + j.
 class LevDistArray:
-    def __init__(self, lev_dist_arr):
-        self.lev_dist_arr = lev_dist_arr
+    def __init__(self, num_words, max_dist=255):
+        index_type = 'H' if num_words <= 0x10000 else 'I'
+        self.num_words = num_words
+        self.firsts = array(index_type)
+        self.seconds = array(index_type)
+        self.dists = array('B' if max_dist <= 0xFF else 'H')
+        self.dense = True
+        self._offsets = None
+
+    def __len__(self):
+        return len(self.dists)
+
+    def append(self, dist, first, second):
+        self.dense = False
+        self._offsets = None
+        self.dists.append(dist)
+        self.firsts.append(first)
+        self.seconds.append(second)
+
+    # Removes every stored pair. An empty store is dense again.
+    def clear(self):
+        del self.dists[:]
+        del self.firsts[:]
+        del self.seconds[:]
+        self.dense = True
+        self._offsets = None
+
+    # Appends the pairs stored in LevDistArray `other`. The result is only
+    # dense if both are and `other` holds the rows following the last row of
+    # this one.
+    def extend(self, other):
+        self.dense = self.dense and other.dense
+        self._offsets = None
+        self.dists.extend(other.dists)
+        self.firsts.extend(other.firsts)
+        self.seconds.extend(other.seconds)
+
+    # Appends the distances between word `second` and the words with
+    # indices 0 to len(`dists`)-1. If `max_dist` is given, only the distances
+    # up to `max_dist` are kept, and the store is no longer dense unless all of
+    # them are.
+    def extend_row(self, dists, second, max_dist=None):
+        if max_dist is not None:
+            firsts = [j for j, d in enumerate(dists) if d <= max_dist]
+            if len(firsts) < len(dists):
+                self.dense = False
+                self._offsets = None
+                self.dists.extend([dists[j] for j in firsts])
+                self.firsts.extend(firsts)
+                self.seconds.extend([second] * len(firsts))
+                return
+        count = len(self.dists)
+        self.dists.extend(dists)
+        count = len(self.dists) - count
+        self.firsts.extend(range(0, count))
+        self.seconds.extend([second] * count)
+
+    # Returns the offset of pair (`first`, `second`), where `first` < `second`,
+    # or None if the pair is not stored. Dense stores use the closed-form
+    # triangular offset, sparse ones a hash table built on first use.
+    def offset(self, first, second):
+        if self.dense:
+            k = second * (second - 1) // 2 + first
+            return k if k < len(self.dists) else None
+        if self._offsets is None:
+            num_words = self.num_words
+            self._offsets = {f * num_words + s: k for k, (f, s) in
+                             enumerate(zip(self.firsts, self.seconds))}
+        return self._offsets.get(first * self.num_words + second)
+
+    # Returns a bytes object with a 1 at the offset of each pair whose
+    # distance is in `wanted`, and a 0 everywhere else. Only valid for
+    # byte-sized distances.
+    def _mask(self, wanted):
+        table = bytes([1 if d in wanted else 0 for d in range(0, 0x100)])
+        return self.dists.tobytes().translate(table)
+
+    # Returns the offsets of the pairs whose distance is in `wanted`, in
+    # ascending order.
+    def select(self, wanted):
+        if self.dists.typecode == 'B':
+            mask = self._mask(wanted)
+            return list(compress(range(0, len(mask)), mask))
+        return [k for k, d in enumerate(self.dists) if d in wanted]
+
+    # Returns the number of pairs whose distance is in `wanted`.
+    def count(self, wanted):
+        if self.dists.typecode == 'B':
+            return self._mask(wanted).count(1)
+        return sum([1 for d in self.dists if d in wanted])
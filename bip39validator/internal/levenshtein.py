@@ -0,0 +1,302 @@
+# BIP39 Wordlist Validator - A tool to validate BIP39 wordlists in Latin
+# languages.
+# bip39validator/levenshtein.py: Levenshtein distance kernels
+# Copyright 2020 Ali Sherief
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+
+# Levenshtein distance kernels used by the validation tests. The Levenshtein
+# distance test only asks whether a word pair is closer than the threshold,
+# so most of these kernels take a cap `k` and stop as soon as the distance is
+# known to be at least `k`.
+
+import jellyfish
+
+# NumPy is only needed by the numpy engine.
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+# Returns the Levenshtein distance between `s` and `t` if it is less than `k`,
+# otherwise returns `k`. Only the diagonal band of width 2*(k-1)+1 of the
+# dynamic programming matrix is computed (Ukkonen's cutoff), and the
+# computation stops at the first row whose values are all at least `k`.
+def lev_dist_bounded(s, t, k):
+    if s == t:
+        return 0
+    if k <= 1:
+        return k
+    ls = len(s)
+    lt = len(t)
+    if ls > lt:
+        s, t, ls, lt = t, s, lt, ls
+    if lt - ls >= k:
+        return k
+
+    # The common prefix and suffix never contribute to the distance.
+    p = 0
+    while p < ls and s[p] == t[p]:
+        p += 1
+    if p:
+        s = s[p:]
+        t = t[p:]
+        ls -= p
+        lt -= p
+    q = 0
+    while q < ls and s[ls - 1 - q] == t[lt - 1 - q]:
+        q += 1
+    if q:
+        s = s[:ls - q]
+        t = t[:lt - q]
+        ls -= q
+        lt -= q
+    if ls == 0:
+        return lt if lt < k else k
+    if k == 2:
+        # What is left of both words differs in its first and last
+        # characters, so a single edit is only enough if `t` is one character.
+        return 1 if lt == 1 else 2
+
+    # Each row only stores the cells of the band, `plo` is the column of the
+    # first stored cell of the previous row.
+    d = k - 1
+    prev = list(range(0, min(lt, d) + 1))
+    plo = 0
+    for i in range(1, ls + 1):
+        lo = i - d if i > d else 0
+        hi = i + d if i + d < lt else lt
+        phi = plo + len(prev) - 1
+        c = s[i - 1]
+        cur = []
+        left = k
+        row_min = k
+        for j in range(lo, hi + 1):
+            if j == 0:
+                v = i
+            else:
+                v = prev[j - 1 - plo] if j - 1 >= plo else k
+                if c != t[j - 1]:
+                    v += 1
+                if j <= phi and prev[j - plo] + 1 < v:
+                    v = prev[j - plo] + 1
+                if left + 1 < v:
+                    v = left + 1
+                if v > k:
+                    v = k
+            cur.append(v)
+            left = v
+            if v < row_min:
+                row_min = v
+        if row_min >= k:
+            return k
+        prev = cur
+        plo = lo
+    v = prev[lt - plo]
+    return v if v < k else k
+
+
+# Lower bounds of the Levenshtein distance, used to discard word pairs that
+# are certainly not closer than the threshold without running a kernel. They
+# work on the features of both words computed by lev_dist_features().
+
+# Returns the number of items two histograms have in common.
+def _histogram_common(a, b):
+    common = 0
+    for key, count in a.items():
+        other = b.get(key)
+        if other:
+            common += count if count < other else other
+    return common
+
+
+def _histogram(items):
+    hist = {}
+    for item in items:
+        hist[item] = hist.get(item, 0) + 1
+    return hist
+
+
+# Every edit changes the length by at most one.
+def length_bound(a, b):
+    return abs(a[1] - b[1])
+
+
+# Bag distance: every edit removes at most one character from, and adds at
+# most one character to, the multiset of characters of the word.
+def bag_bound(a, b):
+    return max(a[1], b[1]) - _histogram_common(a[2], b[2])
+
+
+# q-gram lemma for q=2: words within distance k share at least
+# max(len) - 1 - 2*k bigrams, since an edit destroys at most two of them.
+def qgram_bound(a, b):
+    missing = max(a[1], b[1]) - 1 - _histogram_common(a[3], b[3])
+    return (missing + 1) // 2 if missing > 0 else 0
+
+
+lev_dist_filters = {
+    'length': length_bound,
+    'bag': bag_bound,
+    'qgram': qgram_bound,
+}
+
+
+# Returns the (word, length, character histogram, bigram histogram) features
+# of `word`. Histograms that no filter in `filters` needs are left out.
+def lev_dist_features(word, filters):
+    hist = _histogram(word) if 'bag' in filters else None
+    bigrams = _histogram([word[k:k + 2] for k in range(0, len(word) - 1)]) \
+        if 'qgram' in filters else None
+    return (word, len(word), hist, bigrams)
+
+
+# A BK-tree (Burkhard-Keller tree) of words under the Levenshtein metric. Each
+# node is identified by the order it was added in, and its children are keyed
+# by their distance to it. Finding all words closer than `n` to a query word
+# only visits the subtrees whose key is within `n`-1 of the query's distance
+# to their parent, which is a small fraction of the tree for small `n`.
+class BKTree:
+    def __init__(self):
+        self.words = []
+        self.children = []
+
+    def __len__(self):
+        return len(self.words)
+
+    def add(self, word):
+        words = self.words
+        children = self.children
+        idx = len(words)
+        words.append(word)
+        children.append({})
+        if idx == 0:
+            return idx
+        node = 0
+        while True:
+            dist = jellyfish.levenshtein_distance(words[node], word)
+            child = children[node].get(dist)
+            if child is None:
+                children[node][dist] = idx
+                return idx
+            node = child
+
+    # Returns a list of (node, dist) tuples of every word in the tree whose
+    # Levenshtein distance to `word` is less than `n`, in no particular order.
+    def search(self, word, n):
+        found = []
+        if not self.words:
+            return found
+        r = n - 1
+        words = self.words
+        children = self.children
+        stack = [0]
+        while stack:
+            node = stack.pop()
+            dist = jellyfish.levenshtein_distance(words[node], word)
+            if dist <= r:
+                found.append((node, dist))
+            for key, child in children[node].items():
+                if dist - r <= key <= dist + r:
+                    stack.append(child)
+        return found
+
+
+# Returns the pattern bitmasks of `word` for lev_dist_bitparallel(): a
+# dictionary mapping each character of `word` to an integer with bit k set
+# if the character is at position k.
+def bitparallel_masks(word):
+    peq = {}
+    for k, c in enumerate(word):
+        peq[c] = peq.get(c, 0) | (1 << k)
+    return peq
+
+
+# Returns the Levenshtein distance between a pattern word of length `m`, whose
+# bitmasks `peq` were computed by bitparallel_masks(), and `text`. This is
+# Myers' bit-vector algorithm as formulated by Hyyro: each column of the
+# dynamic programming matrix is encoded as vertical deltas packed in the bits
+# of `pv` (+1) and `mv` (-1), so a column costs a fixed number of integer
+# operations instead of `m` cell updates. BIP39 words are shorter than a
+# machine word, but Python integers also handle longer ones.
+def lev_dist_bitparallel(peq, m, text):
+    if m == 0:
+        return len(text)
+    full = (1 << m) - 1
+    last = 1 << (m - 1)
+    pv = full
+    mv = 0
+    score = m
+    for c in text:
+        eq = peq.get(c, 0)
+        xv = eq | mv
+        xh = (((eq & pv) + pv) ^ pv) | eq
+        ph = mv | (~(xh | pv) & full)
+        mh = pv & xh
+        if ph & last:
+            score += 1
+        elif mh & last:
+            score -= 1
+        # The first row of the matrix increases by one in every column.
+        ph = ((ph << 1) | 1) & full
+        mh = (mh << 1) & full
+        pv = mh | (~(xv | ph) & full)
+        mv = ph & xv
+    return score
+
+
+# Packs `words` into a matrix of character codes with one column per word,
+# padded with zeros to the length of the longest word, for
+# lev_dist_numpy_row(). Returns the matrix and the vector of word lengths.
+def numpy_pack_words(words):
+    if numpy is None:
+        raise ImportError('The numpy Levenshtein distance engine requires NumPy')
+    lengths = numpy.array([len(w) for w in words], dtype=numpy.intp)
+    width = int(lengths.max()) if len(words) else 0
+    buf = ''.join([w.ljust(width, '\0') for w in words]).encode('utf-32-le')
+    matrix = numpy.frombuffer(buf, dtype=numpy.uint32).reshape(len(words), width)
+    return numpy.ascontiguousarray(matrix.T), lengths
+
+
+# Returns a NumPy vector of the Levenshtein distances between word `i` of the
+# matrix packed by numpy_pack_words() and each of the words 0 to `i`-1. The
+# dynamic programming matrices of all `i` pairs are computed together, one row
+# (a character of word `i`) at a time, so there are only a handful of NumPy
+# operations per character instead of a Python call per pair. Within a row,
+# D[r][c] = min(D[r][c-1] + 1, best[c]) is resolved with a cumulative minimum
+# of best[c] - c, and the padding columns past the end of a word never affect
+# its distance, which is read from column len(word).
+def lev_dist_numpy_row(matrix, lengths, i):
+    width = matrix.shape[0]
+    m = int(lengths[i])
+    word = matrix[:m, i]
+    others = matrix[:, :i]
+    offsets = numpy.arange(1, width + 1, dtype=numpy.int16)[:, None]
+    prev = numpy.repeat(numpy.arange(0, width + 1, dtype=numpy.int16)[:, None], i,
+                        axis=1)
+    for r in range(1, m + 1):
+        best = prev[:-1] + (others != word[r - 1])
+        numpy.minimum(best, prev[1:] + 1, out=best)
+        best -= offsets
+        numpy.minimum.accumulate(best, axis=0, out=best)
+        numpy.minimum(best, r, out=best)
+        best += offsets
+        prev = numpy.vstack((numpy.full((1, i), r, dtype=numpy.int16), best))
+    return prev[lengths[:i], numpy.arange(0, i)]
@@ -82,21 +82,28 @@ def logdefault(*args):
 
 # Utility function to print a progress bar that repeatedly calls a worker
 # function that takes it's own `kwargs` and returns its updated `kwargs` for
-# the next iteration.
-def progressbar(desc, low, high, func, **kwargs):
+# the next iteration. If `stop` is given, it is called with `kwargs` after
+# every iteration but the last, and the loop ends early once it returns True.
+def progressbar(desc, low, high, func, stop=None, **kwargs):
     if not params.quiet:
         if not params.ascii:
             for i in track(range(low, high), description=desc):
                 kwargs = func(i, **kwargs)
+                if stop is not None and i < high - 1 and stop(kwargs):
+                    break
             return kwargs
         else:
             print(desc + ", please wait...")
             for i in range(low, high):
                 kwargs = func(i, **kwargs)
+                if stop is not None and i < high - 1 and stop(kwargs):
+                    break
             return kwargs
     else:
         for i in range(low, high):
             kwargs = func(i, **kwargs)
+            if stop is not None and i < high - 1 and stop(kwargs):
+                break
         return kwargs
 
 
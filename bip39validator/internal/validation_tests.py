@@ -24,26 +24,209 @@
 # Functions in this file are simultaneously the backbone of the command line
 # program and the API.
 
+from multiprocessing import Pool
+
 import jellyfish
 
 from .data_structs import LevDistArray
+from .levenshtein import lev_dist_bounded, BKTree, bitparallel_masks, \
+    lev_dist_bitparallel, numpy_pack_words, lev_dist_numpy_row, lev_dist_filters, \
+    lev_dist_features
 from .util import is_all_lower
 
 
 # Callback functions called from progressbar()
 
-def compute_lev_dist_interal(i, distance_array=[], wordlist=[], line_numbers=[],
-                             strarray="", n=0):
-    for j in range(0, i):  # j between 0 and i-1 inclusive
-        dist = jellyfish.levenshtein_distance(wordlist[j], wordlist[i])
-        l = len(wordlist)
-        if j == l-2 and i == l-1:
-            # The end
-            strarray += f"{dist},{j},{i}"
+# The distances are appended to `distance_array`, a LevDistArray, in the order
+# (0, 1), (0, 2), (1, 2), (0, 3), ... that is row by row of the lower triangle
+# of the distance matrix. If `max_dist` is not None, only the pairs with a
+# distance up to `max_dist` are kept.
+def compute_lev_dist_interal(i, distance_array=None, wordlist=[], line_numbers=[],
+                             n=0, max_dist=None):
+    word = wordlist[i]
+    # j between 0 and i-1 inclusive
+    distance_array.extend_row([jellyfish.levenshtein_distance(wordlist[j], word)
+                               for j in range(0, i)], i, max_dist)
+    return {'distance_array': distance_array, 'wordlist': wordlist,
+            'line_numbers': line_numbers, 'n': n, 'max_dist': max_dist}
+
+
+# Like compute_lev_dist_interal(), but only keeps the word pairs with a
+# Levenshtein distance less than `n`, or up to `max_dist` if it is not None.
+# Each pair first goes through the lower bounds named in `filters`, in order,
+# and is discarded by the first one that is beyond that; `filter_counts`
+# counts the pairs discarded by each filter and the pairs left for the kernel.
+# For a cap of 2 the banded kernel gives up after one or two rows on almost
+# every pair; for larger caps the compiled jellyfish kernel is still faster
+# than the banded one.
+def compute_lev_dist_bounded_internal(i, distance_array=None, wordlist=[],
+                                      line_numbers=[], n=0, filters=('length',),
+                                      features=None, filter_counts=None,
+                                      max_dist=None):
+    k = n if max_dist is None else max_dist + 1
+    if features is None:
+        features = [lev_dist_features(w, filters) for w in wordlist]
+    if filter_counts is None:
+        filter_counts = {name: 0 for name in filters}
+        filter_counts['kernel'] = 0
+    stages = [(name, lev_dist_filters[name]) for name in filters]
+    word = wordlist[i]
+    fi = features[i]
+    kernel_count = 0
+    for j in range(0, i):
+        fj = features[j]
+        for name, bound in stages:
+            if bound(fi, fj) >= k:
+                filter_counts[name] += 1
+                break
         else:
-            strarray += f"{dist},{j},{i}-"
+            kernel_count += 1
+            if k <= 2:
+                dist = lev_dist_bounded(wordlist[j], word, k)
+            else:
+                dist = jellyfish.levenshtein_distance(wordlist[j], word)
+            if dist < k:
+                distance_array.append(dist, j, i)
+    filter_counts['kernel'] += kernel_count
+    return {'distance_array': distance_array, 'wordlist': wordlist,
+            'line_numbers': line_numbers, 'n': n, 'filters': filters,
+            'features': features, 'filter_counts': filter_counts,
+            'max_dist': max_dist}
+
+
+# Like compute_lev_dist_bounded_internal(), but instead of comparing word `i`
+# with every previous word, it searches a BK-tree of the previous words for
+# the ones closer than `n` (or up to `max_dist`), then adds word `i` to the
+# tree.
+def compute_lev_dist_bktree_internal(i, distance_array=None, wordlist=[],
+                                     line_numbers=[], n=0, tree=None, max_dist=None):
+    if tree is None:
+        tree = BKTree()
+        for j in range(0, i):
+            tree.add(wordlist[j])
+    k = n if max_dist is None else max_dist + 1
+    for j, dist in sorted(tree.search(wordlist[i], k)):
+        distance_array.append(dist, j, i)
+    tree.add(wordlist[i])
+    return {'distance_array': distance_array, 'wordlist': wordlist,
+            'line_numbers': line_numbers, 'n': n, 'tree': tree, 'max_dist': max_dist}
+
+
+# Like compute_lev_dist_interal(), but with the bit-parallel kernel. Word `i`
+# is the pattern of every comparison of its row, so its bitmasks are only
+# computed once.
+def compute_lev_dist_bitparallel_internal(i, distance_array=None, wordlist=[],
+                                          line_numbers=[], n=0, max_dist=None):
+    word = wordlist[i]
+    peq = bitparallel_masks(word)
+    m = len(word)
+    distance_array.extend_row([lev_dist_bitparallel(peq, m, wordlist[j])
+                               for j in range(0, i)], i, max_dist)
+    return {'distance_array': distance_array, 'wordlist': wordlist,
+            'line_numbers': line_numbers, 'n': n, 'max_dist': max_dist}
+
+
+# Like compute_lev_dist_interal(), but computes the whole row with NumPy
+# operations over a matrix of the packed wordlist, which is built on the
+# first call.
+def compute_lev_dist_numpy_internal(i, distance_array=None, wordlist=[],
+                                    line_numbers=[], n=0, matrix=None, lengths=None,
+                                    max_dist=None):
+    if matrix is None:
+        matrix, lengths = numpy_pack_words(wordlist)
+    distance_array.extend_row(lev_dist_numpy_row(matrix, lengths, i).tolist(), i,
+                              max_dist)
+    return {'distance_array': distance_array, 'wordlist': wordlist,
+            'line_numbers': line_numbers, 'n': n, 'matrix': matrix,
+            'lengths': lengths, 'max_dist': max_dist}
+
+
+lev_dist_engines = {
+    'jellyfish': compute_lev_dist_interal,
+    'banded': compute_lev_dist_bounded_internal,
+    'bktree': compute_lev_dist_bktree_internal,
+    'bitparallel': compute_lev_dist_bitparallel_internal,
+    'numpy': compute_lev_dist_numpy_internal,
+}
+
+
+# Splits the rows 1 to `num_words`-1 of the lower triangle of the distance
+# matrix into at most `num_tiles` (low, high) row ranges holding roughly the
+# same number of word pairs each. Row i holds i pairs.
+def lev_dist_tiles(num_words, num_tiles):
+    if num_words < 2:
+        return []
+    total = num_words * (num_words - 1) // 2
+    bounds = [1]
+    for k in range(1, num_tiles):
+        # Rows before r hold r*(r-1)/2 pairs
+        r = int((1 + (1 + 8 * total * k / num_tiles) ** 0.5) / 2)
+        if bounds[-1] < r < num_words:
+            bounds.append(r)
+    bounds.append(num_words)
+    return [*zip(bounds, bounds[1:])]
+
+
+# The sorted wordlist is sent to each process pool worker once, when it starts,
+# instead of with every tile.
+_worker_wordlist = None
+
+
+def _init_lev_dist_worker(wordlist):
+    global _worker_wordlist
+    _worker_wordlist = wordlist
+
+
+# Runs the engine callback over the rows of one tile inside a worker and
+# returns the LevDistArray holding the distances of that tile, along with the
+# filter counts of the engines that have any.
+def _lev_dist_tile(tile):
+    low, high, n, engine, longest, extra_kwargs = tile
+    wordlist = _worker_wordlist
+    callback = lev_dist_engines[engine]
+    kwargs = {'distance_array': LevDistArray(len(wordlist), longest),
+              'wordlist': wordlist, 'line_numbers': [], 'n': n, **extra_kwargs}
+    for i in range(low, high):
+        kwargs = callback(i, **kwargs)
+    return kwargs['distance_array'], kwargs.get('filter_counts')
+
+
+# Merges the result of tile `i` computed by the process pool. Tiles are
+# returned in row order, so dense stores stay dense.
+def compute_lev_dist_tile_internal(i, distance_array=None, wordlist=[],
+                                   line_numbers=[], n=0, num_tiles=0,
+                                   results=None, pool=None, filter_counts=None,
+                                   max_dist=None):
+    tile_array, tile_counts = next(results)
+    distance_array.extend(tile_array)
+    if tile_counts is not None:
+        if filter_counts is None:
+            filter_counts = dict.fromkeys(tile_counts, 0)
+        for name, count in tile_counts.items():
+            filter_counts[name] += count
+    if i == num_tiles - 1:
+        pool.close()
+        pool.join()
     return {'distance_array': distance_array, 'wordlist': wordlist,
-            'line_numbers': line_numbers, 'strarray': strarray, 'n': n}
+            'line_numbers': line_numbers, 'n': n, 'num_tiles': num_tiles,
+            'results': results, 'pool': pool, 'filter_counts': filter_counts,
+            'max_dist': max_dist}
+
+
+# Stop predicate of the Levenshtein distance loop in fail-fast mode, called
+# with the kwargs of the callbacks after each row or tile except the last one.
+# Fail-fast mode only keeps the pairs closer than `n`, so the loop can stop as
+# soon as any pair is stored. The process pool, if any, is terminated and the
+# result is marked incomplete.
+def stop_lev_dist_internal(kwargs):
+    if len(kwargs['distance_array']) == 0:
+        return False
+    pool = kwargs.get('pool')
+    if pool is not None:
+        pool.terminate()
+        pool.join()
+    kwargs['complete'] = False
+    return True
 
 
 def sanitize_internal(i, err_lines=[], l=[], line_nums=[]):
@@ -125,13 +308,36 @@ def validate_sanitized_preamble(l):
     return 0, len(l), sanitize_internal, kwargs
 
 
-def validate_levenshtein_distance_preamble(word_line_arr, n):
+# With more than one worker, the loop runs over tiles of rows computed by a
+# process pool instead of over the rows themselves. Each worker gets several
+# tiles so that the progress bar keeps moving and slow tiles even out.
+# `filters` is only used by the banded engine. Only the pairs with a distance
+# up to `max_dist` are kept if it is not None; the banded and bktree engines
+# never keep pairs at or beyond `n`, so for them it defaults to `n`-1.
+def validate_levenshtein_distance_preamble(word_line_arr, n, engine='jellyfish',
+                                           workers=1, filters=('length',),
+                                           max_dist=None):
     wordlist = word_line_arr.word_list
     line_numbers = word_line_arr.line_numbers
 
-    kwargs = {'distance_array': [], 'wordlist': wordlist,
-              'line_numbers': line_numbers, 'strarray': '', 'n': n}
-    return 1, len(wordlist), compute_lev_dist_interal, kwargs
+    longest = max([len(w) for w in wordlist], default=0)
+    if max_dist is None and engine in ['banded', 'bktree']:
+        max_dist = n - 1
+    extra_kwargs = {'filters': tuple(filters)} if engine == 'banded' else {}
+    extra_kwargs['max_dist'] = max_dist
+    kwargs = {'distance_array': LevDistArray(len(wordlist), longest),
+              'wordlist': wordlist, 'line_numbers': line_numbers, 'n': n,
+              'max_dist': max_dist}
+    if workers > 1 and len(wordlist) > 2:
+        tiles = lev_dist_tiles(len(wordlist), workers * 4)
+        pool = Pool(workers, _init_lev_dist_worker, (list(wordlist),))
+        results = pool.imap(_lev_dist_tile, [(low, high, n, engine, longest,
+                                              extra_kwargs)
+                                             for low, high in tiles])
+        kwargs.update({'num_tiles': len(tiles), 'results': results, 'pool': pool})
+        return 0, len(tiles), compute_lev_dist_tile_internal, kwargs
+    kwargs.update(extra_kwargs)
+    return 1, len(wordlist), lev_dist_engines[engine], kwargs
 
 
 def validate_uniq_chars_preamble(word_line_arr, n):
@@ -195,23 +401,17 @@ def validate_sanitized(kwargs):
 # WordAndLineArray is sorted.
 # Returns True if validation succeeded, else returns False.
 def validate_levenshtein_distance(**kwargs):
-    strarray = kwargs['strarray']
+    lev_dist_arr = kwargs['distance_array']
     n = kwargs['n']
-    lev_dist_arr = LevDistArray(strarray)
 
-    # If lev_dist_arr is empty (has no elements), then this test succeeded.
+    # If lev_dist_arr has no distances less than n, then this test succeeded.
     # Else it failed.
-    n_small_levdists = 0
-    split = strarray.split('-')
-    for data in split:
-        dist = int(data.split(',')[0])
-        if dist < n:
-            n_small_levdists += 1
+    n_small_levdists = lev_dist_arr.count(range(0, n))
 
     if n_small_levdists > 0:
-        return False, (lev_dist_arr, split)
+        return False, lev_dist_arr
     else:
-        return True, (lev_dist_arr, split)
+        return True, lev_dist_arr
 
 
 # Given a WordAndLineArray data structure `word_line_arr`, validate that all
@@ -57,6 +57,8 @@ setup(
         # eg:
         #   'rst': ['docutils>=0.11'],
         #   ':python_version=="2.6"': ['argparse'],
+        # Only needed by the numpy Levenshtein distance engine
+        'numpy': ['numpy'],
     },
     setup_requires=[
         'pytest-runner',
@@ -2,6 +2,11 @@ from unittest import TestCase
 from bip39validator import InvalidWordList, ValidationFailed
 from bip39validator.BIP39WordList import BIP39WordList
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 valid_list = """abcdef
 ghijkl
 mnopqr
@@ -60,6 +65,138 @@ class TestBIP39WordList(TestCase):
             except ValidationFailed as e:
                 pass
 
+    def test_test_lev_distance_engines(self):
+        with open('./tests/english.txt') as f:
+            bip39 = BIP39WordList("file_list", handle=f)
+        for n in [2, 3]:
+            try:
+                expected_res = bip39.test_lev_distance(n).getwordpairs_lt(n)
+            except ValidationFailed as e:
+                expected_res = e.status_obj.getwordpairs_lt(n)
+            for engine in ['banded', 'bktree']:
+                try:
+                    res = bip39.test_lev_distance(n, engine=engine)
+                except ValidationFailed as e:
+                    res = e.status_obj
+                self.assertEqual(expected_res, res.getwordpairs_lt(n))
+                self.assertEqual(len(expected_res), len(res))
+        try:
+            bip39.test_lev_distance(2, engine='foo')
+            self.fail()
+        except AssertionError as e:
+            pass
+
+    def test_test_lev_distance_fail_fast(self):
+        with open('./tests/english.txt') as f:
+            bip39 = BIP39WordList("file_list", handle=f)
+        for engine in ['jellyfish', 'banded', 'bktree']:
+            for workers in [1, 2]:
+                try:
+                    bip39.test_lev_distance(2, engine=engine, workers=workers,
+                                            fail_fast=True)
+                    self.fail()
+                except ValidationFailed as e:
+                    res = e.status_obj
+                self.assertFalse(res.complete)
+                self.assertEqual(1, res.max_dist)
+                pairs = res.getwordpairs_lt(2)
+                # english.txt has 806 pairs closer than 2, with workers the
+                # first tile with any of them is kept whole.
+                self.assertTrue(0 < len(pairs) < 806)
+                if workers == 1:
+                    self.assertEqual(1, len(pairs))
+                for pair in pairs:
+                    self.assertEqual(1, res.getdist(*pair))
+        bip39 = BIP39WordList("valid_list", string=valid_list)
+        res = bip39.test_lev_distance(2, fail_fast=True)
+        self.assertTrue(res.complete)
+        try:
+            bip39.test_lev_distance(2, max_dist=3, fail_fast=True)
+            self.fail()
+        except AssertionError as e:
+            pass
+
+    def test_iter_lev_violations(self):
+        with open('./tests/english.txt') as f:
+            bip39 = BIP39WordList("file_list", handle=f)
+        try:
+            res = bip39.test_lev_distance(3, engine='bktree')
+            self.fail()
+        except ValidationFailed as e:
+            res = e.status_obj
+        expected_res = [(*words, *lines, res.getdist(*words)) for words, lines in
+                        zip(res.getwordpairs_lt(3), res.getlinepairs_lt(3))]
+        for engine in ['jellyfish', 'banded']:
+            self.assertEqual(expected_res, list(bip39.iter_lev_violations(3, engine=engine)))
+        self.assertEqual(expected_res, list(bip39.iter_lev_violations(3, workers=2)))
+        violations = bip39.iter_lev_violations(2, workers=2)
+        self.assertEqual(("aim", 43, "air", 44, 1), next(violations))
+        violations.close()
+        bip39 = BIP39WordList("valid_list", string=valid_list)
+        self.assertEqual([], list(bip39.iter_lev_violations(2)))
+
+    def test_test_lev_distance_filters(self):
+        with open('./tests/english.txt') as f:
+            bip39 = BIP39WordList("file_list", handle=f)
+        n_pairs = 2048 * 2047 // 2
+        for n in [2, 3]:
+            expected_res = None
+            for filters in [(), ('length',), ('length', 'bag', 'qgram'), ('qgram', 'bag')]:
+                try:
+                    res = bip39.test_lev_distance(n, engine='banded', filters=filters)
+                except ValidationFailed as e:
+                    res = e.status_obj
+                if expected_res is None:
+                    expected_res = res.getwordpairs_lt(n)
+                self.assertEqual(expected_res, res.getwordpairs_lt(n))
+                self.assertEqual(n_pairs, sum(res.filter_counts.values()))
+                self.assertEqual(set(filters) | {'kernel'}, set(res.filter_counts))
+        try:
+            bip39.test_lev_distance(2, engine='banded', filters=('foo',))
+            self.fail()
+        except AssertionError as e:
+            pass
+
+    def test_test_lev_distance_exact_engines(self):
+        with open('./tests/english.txt') as f:
+            bip39 = BIP39WordList("file_list", handle=f)
+        try:
+            expected_res = bip39.test_lev_distance(2)
+        except ValidationFailed as e:
+            expected_res = e.status_obj
+        engines = ['bitparallel']
+        if numpy is not None:
+            engines.append('numpy')
+        for engine in engines:
+            try:
+                res = bip39.test_lev_distance(2, engine=engine)
+            except ValidationFailed as e:
+                res = e.status_obj
+            self.assertEqual(expected_res.lev_dist_arr.dists, res.lev_dist_arr.dists)
+
+    def test_test_lev_distance_workers(self):
+        with open('./tests/english.txt') as f:
+            bip39 = BIP39WordList("file_list", handle=f)
+        for engine in ['jellyfish', 'bktree']:
+            try:
+                expected_res = bip39.test_lev_distance(2, engine=engine)
+            except ValidationFailed as e:
+                expected_res = e.status_obj
+            try:
+                res = bip39.test_lev_distance(2, engine=engine, workers=3)
+            except ValidationFailed as e:
+                res = e.status_obj
+            self.assertEqual(expected_res.lev_dist_arr.dists, res.lev_dist_arr.dists)
+            self.assertEqual(expected_res.lev_dist_arr.firsts, res.lev_dist_arr.firsts)
+            self.assertEqual(expected_res.lev_dist_arr.seconds, res.lev_dist_arr.seconds)
+        self.assertEqual(1, res.getdist("aim", "air"))
+        for t in [0, "2"]:
+            try:
+                bip39.test_lev_distance(2, workers=t)
+                self.fail()
+            except AssertionError as e:
+                pass
+
 
     def test_test_initial_chars(self):
         with open('./tests/english.txt') as f:
@@ -1,5 +1,5 @@
 from unittest import TestCase
-from bip39validator import ValidationFailed
+from bip39validator import DistanceNotRetained, ValidationFailed
 from bip39validator.BIP39WordList import BIP39WordList
 
 levdist_gt2 = """brown
@@ -134,6 +134,29 @@ class TestLevDistResult(TestCase):
             res = e.status_obj
         expected_res = 1
         self.assertEqual(expected_res, res.getdist("brow", "brol"))
+        concat = "\n".join([levdist_le2, levdist_gt2])
+        bip39 = BIP39WordList("levdist_concat", string=concat)
+        for engine in ['jellyfish', 'bktree']:
+            try:
+                res = bip39.test_lev_distance(2, engine=engine)
+            except ValidationFailed as e:
+                res = e.status_obj
+            self.assertEqual(1, res.getdist("brow", "brol"))
+            self.assertEqual(1, res.getdist("brown", "brow"))
+            try:
+                res.getdist("brol", "zzz")
+                self.fail()
+            except KeyError as e:
+                pass
+            if engine == 'jellyfish':
+                self.assertEqual(3, res.getdist("brpyt", "brol"))
+            else:
+                # Only pairs closer than the threshold are kept
+                try:
+                    res.getdist("brpyt", "brol")
+                    self.fail()
+                except KeyError as e:
+                    pass
         for t in [(1, "abc"), ("", "abc"), ("ABC", "abc"),
                   ("abc", 1), ("abc", ""), ("abc", "ABC")]:
             try:
@@ -245,3 +268,40 @@ class TestLevDistResult(TestCase):
                     pass
                 except KeyError as e:
                     pass
+
+    def test_max_dist(self):
+        concat = "\n".join([levdist_le2, levdist_gt2])
+        bip39 = BIP39WordList("levdist_concat", string=concat)
+        for engine in ['jellyfish', 'bitparallel', 'banded', 'bktree']:
+            try:
+                res = bip39.test_lev_distance(2, engine=engine, max_dist=2)
+            except ValidationFailed as e:
+                res = e.status_obj
+            self.assertEqual(2, res.max_dist)
+            self.assertEqual([("brol", "brow"), ("brow", "brown")], res.getwordpairs_lt(2))
+            self.assertEqual([("brol", "brown")], res.getwordpairs_eq(2))
+            self.assertEqual(2, res.getdist("brol", "brown"))
+            self.assertEqual([(("brol", "brow"), (2, 1), 1), (("brown", "brow"), (3, 1), 1)],
+                             res.getdist_all_lt("brow", 3))
+            for query in [lambda: res.getwordpairs_gt(2), lambda: res.getlinepairs_gt(1),
+                          lambda: res.getwordpairs_eq(3), lambda: res.getlinepairs_lt(4),
+                          lambda: res.getwordpairs_list([1, 3]), lambda: res.getdist_all("brow"),
+                          lambda: res.getdist_all_gt("brow", 1),
+                          lambda: res.getdist("brol", "brpyt")]:
+                try:
+                    query()
+                    self.fail()
+                except DistanceNotRetained as e:
+                    self.assertEqual(2, e.max_dist)
+        try:
+            res = bip39.test_lev_distance(2)
+        except ValidationFailed as e:
+            res = e.status_obj
+        self.assertIsNone(res.max_dist)
+        self.assertEqual([("brol", "brpyt"), ("brow", "brpyt"), ("brown", "brpyt")],
+                         res.getwordpairs_gt(2))
+        try:
+            bip39.test_lev_distance(3, max_dist=1)
+            self.fail()
+        except AssertionError as e:
+            pass
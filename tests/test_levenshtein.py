@@ -0,0 +1,53 @@
+import random
+from unittest import TestCase, skipIf
+
+import jellyfish
+
+from bip39validator.internal.levenshtein import lev_dist_bounded, BKTree, \
+    bitparallel_masks, lev_dist_bitparallel, numpy, numpy_pack_words, \
+    lev_dist_numpy_row
+
+
+def random_words(seed, count, letters, max_length):
+    rng = random.Random(seed)
+    return [''.join([rng.choice(letters) for _ in range(rng.randint(0, max_length))])
+            for _ in range(count)]
+
+
+# Differential tests of the Levenshtein kernels against jellyfish.
+class TestLevenshtein(TestCase):
+    def test_lev_dist_bounded(self):
+        words = random_words(1, 300, "abc", 8)
+        for s, t in zip(words, reversed(words)):
+            expected_res = jellyfish.levenshtein_distance(s, t)
+            for k in range(1, 10):
+                self.assertEqual(min(expected_res, k), lev_dist_bounded(s, t, k))
+
+    def test_lev_dist_bitparallel(self):
+        words = random_words(2, 300, "abcd", 12)
+        with open('./tests/english.txt') as f:
+            words += f.read().split()[:300]
+        for s, t in zip(words, reversed(words)):
+            expected_res = jellyfish.levenshtein_distance(s, t)
+            self.assertEqual(expected_res,
+                             lev_dist_bitparallel(bitparallel_masks(s), len(s), t))
+
+    @skipIf(numpy is None, "NumPy is not installed")
+    def test_lev_dist_numpy_row(self):
+        words = random_words(4, 200, "abcd", 10)
+        matrix, lengths = numpy_pack_words(words)
+        for i in range(0, len(words)):
+            expected_res = [jellyfish.levenshtein_distance(words[j], words[i])
+                            for j in range(0, i)]
+            self.assertEqual(expected_res, lev_dist_numpy_row(matrix, lengths, i).tolist())
+
+    def test_bktree(self):
+        words = random_words(3, 300, "abc", 5)
+        tree = BKTree()
+        for word in words:
+            tree.add(word)
+        for n in [1, 2, 3]:
+            for word in words[:50]:
+                expected_res = [j for j, other in enumerate(words)
+                                if jellyfish.levenshtein_distance(word, other) < n]
+                self.assertEqual(expected_res, sorted([j for j, d in tree.search(word, n)]))